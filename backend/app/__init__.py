@@ -1,22 +1,72 @@
+import atexit
 import os
 import logging
-from flask import Flask, send_from_directory
+import queue
+from logging.handlers import QueueHandler, QueueListener
+from flask import Flask, Response, request, send_from_directory
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
 from app.config.settings import config
+from app.utils import fastjson
+from app.utils import face_processing
 from app.utils.db import init_db, db
 from app.api.auth_routes import auth_bp
 from app.api.facial_routes import facial_bp
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler()
-    ]
+# Try to use orjson for response serialization, fall back to stdlib json
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Configure logging. Handlers enqueue records and a single background
+# thread drains them to stderr, so request threads never block on the
+# stream write or contend on the logging lock.
+_log_queue = queue.Queue(-1)
+_stream_handler = logging.StreamHandler()
+_stream_handler.setFormatter(
+    logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 )
+
+_root_logger = logging.getLogger()
+_root_logger.setLevel(logging.INFO)
+_root_logger.addHandler(QueueHandler(_log_queue))
+
+_log_listener = QueueListener(_log_queue, _stream_handler, respect_handler_level=True)
+_log_listener.start()
+atexit.register(_log_listener.stop)
+
 logger = logging.getLogger(__name__)
 
+# Backend root directory, computed once at import instead of per request
+_ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Health-check body serialized once at import; liveness probes hit this
+# endpoint constantly and the payload never changes
+_HEALTH_PAYLOAD = {
+    'status': 'ok',
+    'message': 'Facial Authentication System API is running',
+    'version': '0.1.0'
+}
+_HEALTH_BODY = fastjson.dumps_bytes(_HEALTH_PAYLOAD)
+
+class OrjsonProvider(DefaultJSONProvider):
+    """JSON provider backed by orjson's C serializer.
+
+    orjson is several times faster than stdlib json on the dict payloads
+    returned by the auth endpoints and handles datetimes natively.
+    """
+
+    def dumps(self, obj, **kwargs):
+        # default=list covers tuples (e.g. faceLocation), which orjson
+        # does not serialize natively
+        return orjson.dumps(
+            obj, option=orjson.OPT_SERIALIZE_NUMPY, default=list
+        ).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
 def create_app(config_name='default'):
     """
     Create and configure the Flask application
@@ -38,6 +88,19 @@ def create_app(config_name='default'):
     app.config['SQLALCHEMY_DATABASE_URI'] = app_config.SQLALCHEMY_DATABASE_URI
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = app_config.SQLALCHEMY_TRACK_MODIFICATIONS
     
+    # Use orjson for jsonify/request parsing when available
+    if orjson is not None:
+        app.json = OrjsonProvider(app)
+
+    # Create the image upload directories once at startup so the request
+    # handlers don't re-stat them on every call
+    uploads_dir = os.path.abspath(os.path.join(app.root_path, '..', 'uploads', 'facial_images'))
+    verification_dir = os.path.abspath(os.path.join(app.root_path, '..', 'uploads', 'verification_images'))
+    os.makedirs(uploads_dir, exist_ok=True)
+    os.makedirs(verification_dir, exist_ok=True)
+    app.config['UPLOADS_DIR'] = uploads_dir
+    app.config['VERIFICATION_DIR'] = verification_dir
+
     # Initialize CORS
     CORS(app, resources={r"/api/*": {"origins": "*"}})
     
@@ -47,19 +110,21 @@ def create_app(config_name='default'):
     except Exception as e:
         logger.error(f"Error initializing database: {str(e)}")
         raise
-    
+
+    # Snapshot hot-path config values into the facial pipeline
+    face_processing.init_app(app)
+
     # Register blueprints
     app.register_blueprint(auth_bp, url_prefix='/api/auth')
     app.register_blueprint(facial_bp, url_prefix='/api/facial')
     
-    # Root route for health check
+    # Root route for health check (prebuilt bytes, no per-probe serialization)
     @app.route('/')
     def index():
-        return {
-            'status': 'ok',
-            'message': 'Facial Authentication System API is running',
-            'version': '0.1.0'
-        }
+        response = Response(_HEALTH_BODY, mimetype='application/json')
+        # The body is constant, so probes can revalidate with 304s
+        response.set_etag('health-0.1.0')
+        return response.make_conditional(request)
         
     # Static route for serving uploaded files
     @app.route('/static/<path:filepath>')
@@ -72,8 +137,10 @@ def create_app(config_name='default'):
         Returns:
             Response: File response
         """
-        # Get the root directory path
-        root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-        return send_from_directory(os.path.join(root_dir), filepath)
+        # Serve from the precomputed root; let browsers cache for a day.
+        # conditional=True enables range/304 handling and hands the open
+        # file to wsgi.file_wrapper, so servers that support it stream
+        # via sendfile(2) instead of copying through Python
+        return send_from_directory(_ROOT_DIR, filepath, max_age=86400, conditional=True)
     
     return app
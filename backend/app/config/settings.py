@@ -11,6 +11,10 @@ class Config:
     # Database
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL', 'sqlite:///instance/auth_system.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # Bounded SQL compilation cache so the hot auth statements are only
+    # compiled to SQL once per process; init_db layers pooling options
+    # on top of this
+    SQLALCHEMY_ENGINE_OPTIONS = {'query_cache_size': 1200}
     
     # JWT
     JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY', secrets.token_hex(32))
@@ -20,8 +24,17 @@ class Config:
     CORS_HEADERS = 'Content-Type'
     
     # Facial Authentication
+    MAX_IMAGE_BYTES = 4 * 1024 * 1024  # Upper bound for uploaded facial image payloads
+    MAX_IMAGE_B64_BYTES = 8 * 1024 * 1024  # Upper bound for a base64 imageData field
+    MAX_CONTENT_LENGTH = 10 * 1024 * 1024  # Werkzeug rejects larger bodies before JSON parsing
+    FACIAL_BATCH_SIZE = 16  # Max frames per stream-analyze micro-batch
+    FACIAL_BATCH_WAIT_MS = 15  # How long the batch worker waits to fill a batch
     FACIAL_AUTH_THRESHOLD = 0.6  # Confidence threshold for facial expression matching
     FACIAL_DETECTION_MODEL = 'hog'  # 'hog' is faster, 'cnn' is more accurate but requires GPU
+    FACIAL_DETECTION_BACKEND = 'opencv'  # DeepFace detector for the single-shot routes
+    # Detector for /stream-analyze frames; deployments with the retina-face
+    # package (and a GPU TensorFlow build) can flip this to 'retinaface'
+    FACIAL_DETECTION_BACKEND_STREAM = os.environ.get('FACIAL_DETECTION_BACKEND_STREAM', 'opencv')
     FACIAL_EMOTION_WEIGHT = 0.3  # Weight for emotion match in authentication (face similarity is 1-this value)
     FACIAL_ALLOW_NO_EMOTION = True  # Whether to allow authentication when emotion can't be detected
     
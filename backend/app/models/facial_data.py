@@ -1,6 +1,82 @@
 from datetime import datetime
+from functools import cached_property
+from threading import Lock
+from typing import Optional
+from sqlalchemy import func
 from app.utils.db import db
-import json
+import msgspec
+import numpy as np
+import orjson
+
+# Try to use zstandard to compress the stored JSON blobs, fall back to
+# raw orjson bytes
+try:
+    import zstandard
+    _zstd_compressor = zstandard.ZstdCompressor(level=3)
+    _zstd_decompressor = zstandard.ZstdDecompressor()
+except ImportError:
+    zstandard = None
+    _zstd_compressor = None
+    _zstd_decompressor = None
+
+# The compressor/decompressor objects are reusable but not safe for
+# concurrent calls; one-shot (de)compression is cheap enough to lock
+_zstd_lock = Lock()
+
+# zstd frame magic; rows written before compression was added (or while
+# the library was absent) lack it and are parsed as-is
+_ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+
+def pack_json(obj, **dumps_kwargs):
+    """Encode obj with orjson and zstd-compress the result if available.
+
+    The landmark JSON is highly repetitive (the same camelCase keys per
+    point), so level-3 zstd typically shrinks it 3-5x, which means
+    fewer SQLite pages read back per authentication.
+    """
+    payload = orjson.dumps(obj, **dumps_kwargs)
+    if _zstd_compressor is not None:
+        with _zstd_lock:
+            return _zstd_compressor.compress(payload)
+    return payload
+
+def unpack_json(blob):
+    """Parse a stored JSON blob, transparently decompressing zstd frames."""
+    if _zstd_decompressor is not None and blob[:4] == _ZSTD_MAGIC:
+        with _zstd_lock:
+            blob = _zstd_decompressor.decompress(blob)
+    return orjson.loads(blob)
+
+class FacialDataDTO(msgspec.Struct):
+    """Typed wire shape of a facial data record.
+
+    msgspec encodes the struct straight to JSON bytes without building
+    an intermediate dict, so API paths that return a record verbatim
+    skip a dict allocation and a full re-traversal per row.
+    """
+    id: int
+    userId: int
+    expression: str
+    emotionScores: dict
+    imagePath: Optional[str]
+    createdAt: Optional[datetime]
+    updatedAt: Optional[datetime]
+
+# Precompiled encoder, shared by single records and lists alike
+_dto_encoder = msgspec.json.Encoder()
+
+# Shared key set for to_dict: copying a prebuilt dict reuses its hashed
+# keys and final table size instead of re-interning seven camelCase
+# strings and growing the table on every call
+_FD_DICT_TEMPLATE = {
+    'id': None,
+    'userId': None,
+    'expression': None,
+    'emotionScores': None,
+    'imagePath': None,
+    'createdAt': None,
+    'updatedAt': None,
+}
 
 class FacialData(db.Model):
     """Facial data model for storing user facial authentication data."""
@@ -9,27 +85,101 @@ class FacialData(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     expression = db.Column(db.String(20), nullable=False)  # e.g., 'happy', 'surprised', etc.
-    facial_data = db.Column(db.Text, nullable=False)  # JSON string of facial landmarks/features
-    emotion_scores = db.Column(db.Text, nullable=True)  # JSON string of emotion scores
+    # Deferred: the landmark blob can run to tens of KB and most queries
+    # (status, to_dict) never touch it; verification paths undefer it
+    facial_data = db.deferred(db.Column(db.LargeBinary, nullable=False))  # orjson bytes of facial landmarks/features
+    face_encoding = db.Column(db.LargeBinary, nullable=True)  # Packed float32 face encoding (128 floats = 512 bytes)
+    emotion_scores = db.Column(db.LargeBinary, nullable=True)  # orjson bytes of emotion scores
     image_path = db.Column(db.String(255), nullable=True)  # Path to the saved facial image
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # SQL-side timestamps: SQLite fills CURRENT_TIMESTAMP itself, so no
+    # Python datetime is built or round-tripped per INSERT/UPDATE
+    created_at = db.Column(db.DateTime, server_default=func.now())
+    updated_at = db.Column(db.DateTime, server_default=func.now(), onupdate=func.now())
+
+    # Composite indexes so the per-user lookups are B-tree probes
+    # instead of table scans
+    __table_args__ = (
+        db.Index('ix_facial_user_expr', 'user_id', 'expression'),
+        db.Index('ix_facial_user_created', 'user_id', 'created_at'),
+    )
     
+    @cached_property
+    def encoding_vector(self):
+        """Zero-copy float32 view of the packed face encoding blob.
+
+        Matching code that only needs the vector can use this without
+        parsing the landmark JSON at all.
+        """
+        if not self.face_encoding:
+            return None
+        return np.frombuffer(self.face_encoding, dtype=np.float32)
+
+    @cached_property
+    def parsed_facial_data(self):
+        """Parsed facial_data JSON, decoded once per instance.
+
+        The verify and login paths read this field several times per
+        request; caching on the instance keeps it to a single parse.
+        """
+        if not self.facial_data:
+            return {}
+        try:
+            data = unpack_json(self.facial_data)
+        except orjson.JSONDecodeError:
+            return {}
+
+        # Rows written since the encoding/metadata split keep the float
+        # vector in the packed blob rather than the JSON text
+        if self.face_encoding and 'faceEncoding' not in data:
+            data['faceEncoding'] = self.encoding_vector
+        return data
+
+    @cached_property
+    def parsed_emotion_scores(self):
+        """Parsed emotion_scores JSON, decoded once per instance.
+
+        No try/except here: the write path (pack_json) guarantees valid
+        JSON, and CPython sets up exception machinery even on the happy
+        path. A raw b'{}' is 2 bytes, so anything <= 2 decodes empty.
+        """
+        es = self.emotion_scores
+        return unpack_json(es) if es and len(es) > 2 else {}
+
+    def to_dto(self):
+        """Build the typed DTO for this record."""
+        return FacialDataDTO(
+            id=self.id,
+            userId=self.user_id,
+            expression=self.expression,
+            emotionScores=self.parsed_emotion_scores,
+            imagePath=self.image_path,
+            createdAt=self.created_at,
+            updatedAt=self.updated_at
+        )
+
+    def to_json_bytes(self):
+        """Serialize this record directly to JSON bytes.
+
+        Bypasses the dict produced by to_dict; hand the bytes straight
+        to a Response with an application/json mimetype.
+        """
+        return _dto_encoder.encode(self.to_dto())
+
+    @staticmethod
+    def encode_list(records):
+        """Serialize a list of records to JSON bytes in one encoder call."""
+        return _dto_encoder.encode([record.to_dto() for record in records])
+
     def to_dict(self):
         """Convert facial data to dictionary for API responses."""
-        emotion_scores_dict = {}
-        if self.emotion_scores:
-            try:
-                emotion_scores_dict = json.loads(self.emotion_scores)
-            except json.JSONDecodeError:
-                emotion_scores_dict = {}
-        
-        return {
-            'id': self.id,
-            'userId': self.user_id,
-            'expression': self.expression,
-            'emotionScores': emotion_scores_dict,
-            'imagePath': self.image_path,
-            'createdAt': self.created_at.isoformat() if self.created_at else None,
-            'updatedAt': self.updated_at.isoformat() if self.updated_at else None
-        }
+        d = _FD_DICT_TEMPLATE.copy()
+        d['id'] = self.id
+        d['userId'] = self.user_id
+        d['expression'] = self.expression
+        d['emotionScores'] = self.parsed_emotion_scores
+        d['imagePath'] = self.image_path
+        # Raw datetimes: orjson formats them to ISO 8601 in C,
+        # skipping the pure-Python isoformat call per row
+        d['createdAt'] = self.created_at
+        d['updatedAt'] = self.updated_at
+        return d
@@ -1,32 +1,108 @@
-from datetime import datetime
+from flask import g
+from sqlalchemy import exists, func, select
+from sqlalchemy.orm import selectinload
 from app.utils.db import db
+from app.models.facial_data import FacialData
+
+# Shared key set for to_dict: copying a prebuilt dict reuses its hashed
+# keys and final table size on every serialization
+_USER_DICT_TEMPLATE = {
+    'id': None,
+    'username': None,
+    'email': None,
+    'hasFacialAuth': None,
+    'createdAt': None,
+    'updatedAt': None,
+}
 
 class User(db.Model):
     """User model representing system users."""
     __tablename__ = 'users'
-    
+
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(80), unique=True, nullable=False)
     email = db.Column(db.String(120), unique=True, nullable=False)
     password = db.Column(db.String(255), nullable=False)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
-    
-    # Relationship with FacialData model
-    facial_data = db.relationship('FacialData', backref='user', lazy=True, uselist=False)
+    # SQL-side timestamps: SQLite fills CURRENT_TIMESTAMP itself, so no
+    # Python datetime is built or round-tripped per INSERT/UPDATE
+    created_at = db.Column(db.DateTime, server_default=func.now())
+    updated_at = db.Column(db.DateTime, server_default=func.now(), onupdate=func.now())
+
+    # Functional indexes so case-insensitive login lookups stay indexed
+    __table_args__ = (
+        db.Index('ix_users_username_lower', func.lower(username)),
+        db.Index('ix_users_email_lower', func.lower(email)),
+    )
     
-    @property
-    def has_facial_auth(self):
-        """Check if user has set up facial authentication."""
-        return self.facial_data is not None
+    # Relationship with FacialData model; joined loading because the
+    # one-to-one row is read on nearly every request (has_facial_auth,
+    # to_dict), so eager loading saves a second SELECT per user
+    facial_data = db.relationship(
+        'FacialData',
+        backref=db.backref('user', lazy='joined'),
+        lazy='joined',
+        uselist=False
+    )
     
+    # Whether the user has set up facial authentication, computed as a
+    # correlated EXISTS subquery so the check never pulls the facial
+    # data blobs into memory
+    has_facial_auth = db.column_property(
+        exists().where(FacialData.user_id == id).correlate_except(FacialData)
+    )
+
+
+    @classmethod
+    def get_cached(cls, user_id):
+        """Fetch a user by ID, memoized for the current request.
+
+        The facial endpoints look the same user up several times while
+        handling one request; the second and later lookups hit a dict
+        on ``g`` instead of SQLite. ``g`` is torn down with the request
+        context, so no explicit invalidation is needed.
+
+        Args:
+            user_id (int): Primary key of the user
+
+        Returns:
+            User or None
+        """
+        cache = g.setdefault('_user_cache', {})
+        if user_id not in cache:
+            cache[user_id] = db.session.get(cls, user_id)
+        return cache[user_id]
+
+    @classmethod
+    def list_with_facial(cls, session):
+        """Fetch all users with their facial data batch-loaded.
+
+        selectinload resolves every user's facial_data in one
+        ``WHERE user_id IN (...)`` query instead of one query per user,
+        and load_only keeps the big landmark blob out of the batch.
+
+        Args:
+            session: SQLAlchemy session to run the query on
+
+        Returns:
+            ScalarResult of User instances
+        """
+        return session.scalars(
+            select(cls).options(
+                selectinload(cls.facial_data).load_only(
+                    FacialData.id, FacialData.expression
+                )
+            )
+        )
+
     def to_dict(self):
         """Convert user to dictionary for API responses."""
-        return {
-            'id': self.id,
-            'username': self.username,
-            'email': self.email,
-            'hasFacialAuth': self.has_facial_auth,
-            'createdAt': self.created_at.isoformat() if self.created_at else None,
-            'updatedAt': self.updated_at.isoformat() if self.updated_at else None
-        }
+        d = _USER_DICT_TEMPLATE.copy()
+        d['id'] = self.id
+        d['username'] = self.username
+        d['email'] = self.email
+        d['hasFacialAuth'] = self.has_facial_auth
+        # Raw datetimes: orjson formats them to ISO 8601 in C,
+        # skipping the pure-Python isoformat call per row
+        d['createdAt'] = self.created_at
+        d['updatedAt'] = self.updated_at
+        return d
@@ -1,7 +1,15 @@
+import atexit
 import sqlite3
 import os
 import logging
+import queue
+import threading
+import time
+from contextlib import contextmanager
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import OperationalError
 
 # Initialize SQLAlchemy
 db = SQLAlchemy()
@@ -9,6 +17,30 @@ db = SQLAlchemy()
 # Set up logging
 logger = logging.getLogger(__name__)
 
+# PRAGMAs applied to every SQLite connection: WAL lets readers and the
+# writer proceed concurrently, NORMAL sync drops an fsync per commit,
+# and a 64MB page cache plus mmap keep the hot user/facial_data pages
+# out of the filesystem layer entirely
+_SQLITE_PRAGMAS = (
+    'PRAGMA journal_mode=WAL',
+    'PRAGMA synchronous=NORMAL',
+    'PRAGMA cache_size=-65536',
+    'PRAGMA mmap_size=268435456',
+    'PRAGMA temp_store=MEMORY',
+)
+
+def _apply_sqlite_pragmas(connection):
+    cursor = connection.cursor()
+    for pragma in _SQLITE_PRAGMAS:
+        cursor.execute(pragma)
+    cursor.close()
+
+@event.listens_for(Engine, 'connect')
+def _on_engine_connect(dbapi_connection, connection_record):
+    """Apply the SQLite PRAGMAs whenever the pool opens a connection."""
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        _apply_sqlite_pragmas(dbapi_connection)
+
 def init_db(app):
     """
     Initialize the database connection and create tables
@@ -25,73 +57,202 @@ def init_db(app):
         db_path = os.path.join(instance_path, 'auth_system.db')
         logger.info(f"Database initialized at {db_path}")
         
-        # Connect to SQLite and create tables if not exist
-        with sqlite3.connect(db_path) as conn:
-            cursor = conn.cursor()
-            
-            # Create users table if it doesn't exist
-            cursor.execute('''
-            CREATE TABLE IF NOT EXISTS users (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                username TEXT UNIQUE NOT NULL,
-                email TEXT UNIQUE NOT NULL,
-                password TEXT NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-            ''')
-            
-            # Create facial_data table if it doesn't exist
-            cursor.execute('''
-            CREATE TABLE IF NOT EXISTS facial_data (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER NOT NULL,
-                expression TEXT NOT NULL,
-                facial_data TEXT NOT NULL,
-                emotion_scores TEXT,
-                image_path TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (user_id) REFERENCES users (id)
-            )
-            ''')
-            
-            conn.commit()
-        
         # Set absolute path for SQLAlchemy
         app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{db_path}"
-        
-        # Initialize SQLAlchemy with the app
+
+        # Engine options: a larger compiled-statement cache so the hot
+        # user/facial_data SELECTs skip SQL compilation, pre-ping to drop
+        # stale pooled connections, and cross-thread access so the
+        # background workers can share pooled SQLite connections
+        engine_options = dict(app.config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+        engine_options.setdefault('query_cache_size', 1200)
+        engine_options.setdefault('pool_pre_ping', True)
+        connect_args = dict(engine_options.get('connect_args') or {})
+        connect_args.setdefault('check_same_thread', False)
+        engine_options['connect_args'] = connect_args
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options
+
+        # Initialize SQLAlchemy with the app; the models are the single
+        # source of truth for the schema, so create_all handles tables
+        # and indexes in one pass over one pooled connection
         db.init_app(app)
         with app.app_context():
             # Create all tables defined by SQLAlchemy models
             db.create_all()
+
+            # Databases created before the encoding/metadata split lack
+            # the packed-encoding column; create_all never alters
+            # existing tables
+            with db.engine.begin() as conn:
+                try:
+                    conn.exec_driver_sql(
+                        'ALTER TABLE facial_data ADD COLUMN face_encoding BLOB'
+                    )
+                except OperationalError:
+                    pass  # Column already exists
+
+                # create_all also skips indexes on pre-existing tables,
+                # so the model-declared indexes must be created here for
+                # upgraded databases; without the functional lower()
+                # indexes the case-insensitive login probes degrade to
+                # full table scans
+                for ddl in (
+                    'CREATE INDEX IF NOT EXISTS ix_users_username_lower '
+                    'ON users (lower(username))',
+                    'CREATE INDEX IF NOT EXISTS ix_users_email_lower '
+                    'ON users (lower(email))',
+                    'CREATE INDEX IF NOT EXISTS ix_facial_user_expr '
+                    'ON facial_data (user_id, expression)',
+                    'CREATE INDEX IF NOT EXISTS ix_facial_user_created '
+                    'ON facial_data (user_id, created_at)',
+                ):
+                    conn.exec_driver_sql(ddl)
+
             logger.info("SQLAlchemy tables created")
     
     except Exception as e:
         logger.error(f"Error initializing database: {str(e)}")
         raise
 
+class SQLiteConnectionPool:
+    """Small thread-safe pool of pre-configured sqlite3 connections.
+
+    Opening a SQLite connection costs a file open plus the PRAGMA round
+    trips on every call; pooling keeps configured connections (and
+    their page caches) warm across requests.
+    """
+
+    def __init__(self, factory, max_size=5):
+        self._factory = factory
+        # queue.Queue is internally locked, so no extra synchronization
+        self._pool = queue.Queue(maxsize=max_size)
+
+    @contextmanager
+    def acquire(self):
+        """Hand out a pooled connection as a context manager."""
+        try:
+            conn = self._pool.get_nowait()
+        except queue.Empty:
+            conn = self._factory()
+        try:
+            yield conn
+        except Exception:
+            # Connection state is suspect after an error; drop it rather
+            # than return it to the pool
+            conn.close()
+            raise
+        else:
+            try:
+                self._pool.put_nowait(conn)
+            except queue.Full:
+                conn.close()
+
+    def close_all(self):
+        """Drain the pool, closing every idle connection."""
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                break
+
+def _make_raw_connection():
+    """Open and configure a sqlite3 connection to the instance database."""
+    app_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    instance_path = os.path.join(app_root, 'instance')
+    db_path = os.path.join(instance_path, 'auth_system.db')
+
+    # Ensure directory exists
+    os.makedirs(instance_path, exist_ok=True)
+
+    # check_same_thread off so pooled connections can move between
+    # request threads; WAL (from the PRAGMAs) makes that safe
+    conn = sqlite3.connect(db_path, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    _apply_sqlite_pragmas(conn)
+    return conn
+
+# Module-level singleton so the warm connections survive across requests
+_raw_pool = SQLiteConnectionPool(_make_raw_connection)
+atexit.register(_raw_pool.close_all)
+
+# Background writer: under WAL a single writer thread can commit while
+# request threads keep reading, so fire-and-forget writes (audit rows,
+# counters, touch-updates) need not pay fsync latency on the request
+# path. Writes whose results the response echoes back should still
+# commit synchronously through the ORM session.
+_write_queue = queue.Queue()
+_WRITE_BATCH_SIZE = 32
+_WRITE_BATCH_WAIT_S = 0.01
+
+def _writer_loop():
+    """Drain the write queue in small batches on a dedicated connection."""
+    conn = _make_raw_connection()
+    while True:
+        batch = [_write_queue.get()]
+        # Collect whatever else arrives within the batch window so one
+        # commit covers up to _WRITE_BATCH_SIZE statements
+        deadline = time.monotonic() + _WRITE_BATCH_WAIT_S
+        while len(batch) < _WRITE_BATCH_SIZE:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(_write_queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        try:
+            for sql, params in batch:
+                conn.execute(sql, params)
+            conn.commit()
+        except Exception as e:
+            logger.error(f"Error in background write batch: {str(e)}")
+            try:
+                conn.rollback()
+            except sqlite3.Error:
+                pass
+        finally:
+            for _ in batch:
+                _write_queue.task_done()
+
+_writer_thread = None
+_writer_thread_lock = threading.Lock()
+
+def enqueue_write(sql, params=()):
+    """
+    Queue a write to run on the background writer thread
+
+    The caller returns immediately; the statement is committed by the
+    writer within roughly one batch window. Only use this for writes
+    the response does not need to read back.
+
+    Args:
+        sql (str): Parameterized SQL statement
+        params (tuple): Bind parameters for the statement
+    """
+    global _writer_thread
+    if _writer_thread is None:
+        with _writer_thread_lock:
+            if _writer_thread is None:
+                _writer_thread = threading.Thread(
+                    target=_writer_loop, daemon=True, name='sqlite-writer'
+                )
+                _writer_thread.start()
+    _write_queue.put((sql, params))
+
+def flush_writes():
+    """Block until every queued write has been committed."""
+    _write_queue.join()
+
 def get_db_connection():
     """
-    Get a database connection
-    
+    Get a database connection from the pool
+
     Returns:
-        sqlite3.Connection: Database connection
+        context manager yielding a sqlite3.Connection: use as
+        ``with get_db_connection() as conn:``
     """
     try:
-        # Get absolute path to database
-        app_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-        instance_path = os.path.join(app_root, 'instance')
-        db_path = os.path.join(instance_path, 'auth_system.db')
-        
-        # Ensure directory exists
-        os.makedirs(instance_path, exist_ok=True)
-        
-        # Connect to the database
-        conn = sqlite3.connect(db_path)
-        conn.row_factory = sqlite3.Row
-        return conn
+        return _raw_pool.acquire()
     except Exception as e:
         logger.error(f"Error connecting to database: {str(e)}")
         raise
@@ -0,0 +1,32 @@
+"""JSON helpers that auto-upgrade to orjson when it is installed.
+
+Import ``loads``/``dumps`` from here instead of the stdlib ``json``
+module; callers get orjson's C encoder (4-6x faster) when the package
+is present and identical stdlib behavior otherwise. Hot paths that
+need orjson-specific options (e.g. OPT_SERIALIZE_NUMPY) should keep
+importing orjson directly.
+"""
+
+# Try to use orjson, fall back to stdlib json
+try:
+    import orjson as _orjson
+
+    loads = _orjson.loads
+
+    def dumps(obj):
+        """Serialize obj to a JSON str (orjson returns bytes natively)."""
+        return _orjson.dumps(obj).decode('utf-8')
+
+    def dumps_bytes(obj):
+        """Serialize obj straight to JSON bytes, skipping the str decode."""
+        return _orjson.dumps(obj)
+
+except ImportError:
+    import json as _json
+
+    loads = _json.loads
+    dumps = _json.dumps
+
+    def dumps_bytes(obj):
+        """Serialize obj to JSON bytes via the stdlib encoder."""
+        return _json.dumps(obj).encode('utf-8')
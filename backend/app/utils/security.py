@@ -3,41 +3,73 @@ import jwt
 import bcrypt
 import datetime
 import logging
+import threading
+import time
 from functools import wraps
+from cachetools import LRUCache
 from flask import request, jsonify, current_app
+from argon2 import PasswordHasher
+from argon2.exceptions import VerifyMismatchError, VerificationError, InvalidHash
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
+# Argon2id hasher (memory-hard, resists GPU cracking better than bcrypt).
+# Tuned for concurrent logins: two passes over 64MiB with two lanes
+# keeps memory-hardness while verifying in tens of ms, so parallel
+# login requests do not stack up behind quarter-second hashes.
+_password_hasher = PasswordHasher(time_cost=2, memory_cost=64 * 1024, parallelism=2)
+
 def hash_password(password):
     """
-    Hash a password using bcrypt
-    
+    Hash a password using Argon2id
+
     Args:
         password (str): Plain text password
-        
+
     Returns:
         str: Hashed password
     """
-    # Generate a salt and hash the password
-    salt = bcrypt.gensalt()
-    hashed = bcrypt.hashpw(password.encode('utf-8'), salt)
-    
-    return hashed.decode('utf-8')
+    return _password_hasher.hash(password)
 
 def verify_password(hashed_password, password):
     """
     Verify a password against its hash
-    
+
+    Supports Argon2id hashes as well as legacy bcrypt hashes created
+    before the Argon2 switch.
+
     Args:
         hashed_password (str): Hashed password
         password (str): Plain text password to check
-        
+
     Returns:
         bool: True if password matches hash, False otherwise
     """
+    if hashed_password.startswith('$argon2'):
+        try:
+            return _password_hasher.verify(hashed_password, password)
+        except (VerifyMismatchError, VerificationError, InvalidHash):
+            return False
+
+    # Legacy bcrypt hash
     return bcrypt.checkpw(password.encode('utf-8'), hashed_password.encode('utf-8'))
 
+def password_needs_rehash(hashed_password):
+    """
+    Check whether a stored hash should be upgraded to the current
+    Argon2id parameters (covers legacy bcrypt hashes too)
+
+    Args:
+        hashed_password (str): Hashed password
+
+    Returns:
+        bool: True if the hash should be regenerated
+    """
+    if not hashed_password.startswith('$argon2'):
+        return True
+    return _password_hasher.check_needs_rehash(hashed_password)
+
 def generate_token(user_id, expiration=24):
     """
     Generate a JWT token for user authentication
@@ -69,26 +101,63 @@ def generate_token(user_id, expiration=24):
         logger.error(f"Error generating token: {str(e)}")
         return None
 
+# Verified-token cache: a token's signature never changes, so the
+# HMAC-SHA256 + base64 + JSON work is paid once per token per process.
+# Expiry is re-checked on every hit so a cached entry can never outlive
+# its exp claim.
+_token_cache = LRUCache(maxsize=10_000)
+_token_cache_lock = threading.Lock()
+
+# Tokens revoked before their natural expiry (e.g. on logout)
+_revoked_tokens = set()
+
+def revoke_token(token):
+    """
+    Revoke a token before its natural expiry
+
+    Args:
+        token (str): JWT token to refuse from now on
+    """
+    with _token_cache_lock:
+        _revoked_tokens.add(token)
+        _token_cache.pop(token, None)
+
 def decode_token(token):
     """
     Decode a JWT token
-    
+
     Args:
         token (str): JWT token
-        
+
     Returns:
         dict: Token payload if valid
         None: If token is invalid
     """
+    with _token_cache_lock:
+        if token in _revoked_tokens:
+            return None
+        cached = _token_cache.get(token)
+
+    if cached is not None:
+        user_id, exp = cached
+        # Expired entries are refused even though the signature was
+        # valid; exp is a unix epoch, so compare against time.time()
+        if exp is None or exp > time.time():
+            return user_id
+        return None
+
     try:
         # Decode and verify token
         payload = jwt.decode(
-            token, 
+            token,
             current_app.config.get('JWT_SECRET_KEY'),
             algorithms=['HS256']
         )
-        
-        return payload['sub']
+
+        user_id = payload['sub']
+        with _token_cache_lock:
+            _token_cache[token] = (user_id, payload.get('exp'))
+        return user_id
     except jwt.ExpiredSignatureError:
         logger.warning("Token expired")
         return None
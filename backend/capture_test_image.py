@@ -12,33 +12,55 @@ def capture_image():
     if not cap.isOpened():
         print("Error: Could not open webcam")
         return False
-    
+
+    # Keep the driver buffer at one frame so the preview shows the
+    # latest frame instead of lagging several buffered ones behind
+    cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+
+    # 480p MJPEG stream: the preview doesn't need the camera's native
+    # resolution and MJPEG frames decode far faster than H.264. The
+    # saved capture inherits this size, which is still well above the
+    # 224px face chip DeepFace works on.
+    cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
+    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
+    cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*'MJPG'))
+
     # Output file path
     output_path = os.path.join(test_dir, "sample_face.jpg")
     print(f"Output will be saved to: {output_path}")
-    
+
     print("\nPress SPACE to capture an image (or ESC to quit)")
-    
+
+    frame_count = 0
     while True:
-        # Read frame from webcam
-        ret, frame = cap.read()
-        if not ret:
+        # grab() only advances the stream (no decode); retrieve() does
+        # the actual decode, and only every other frame needs it for a
+        # smooth-enough preview
+        if not cap.grab():
             print("Error: Failed to grab frame")
             break
-        
-        # Display frame
-        cv2.imshow("Capture Test Image (Press SPACE to capture, ESC to quit)", frame)
-        
+
+        frame_count += 1
+        if frame_count % 2 == 0:
+            ret, frame = cap.retrieve()
+            if ret:
+                cv2.imshow("Capture Test Image (Press SPACE to capture, ESC to quit)", frame)
+
         # Wait for key press
         key = cv2.waitKey(1) & 0xFF
-        
+
         # Capture when space bar is pressed
         if key == 32:  # SPACE key
-            # Save image
+            # Decode a fresh frame for the capture, not the (possibly
+            # skipped) preview frame
+            ret, frame = (cap.retrieve() if cap.grab() else (False, None))
+            if not ret:
+                print("Error: Failed to capture frame")
+                break
             cv2.imwrite(output_path, frame)
             print(f"Image captured and saved to {output_path}")
             break
-        
+
         # Exit when ESC is pressed
         elif key == 27:  # ESC key
             print("Capture cancelled")
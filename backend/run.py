@@ -27,9 +27,21 @@ def main():
         # Get port from environment or use default
         port = int(os.environ.get('PORT', 5000))
         
-        # Run the app
+        # Run the app. Outside development, prefer waitress: a real
+        # multi-threaded WSGI server lets concurrent auth requests reach
+        # the batching pipeline together (the stream BatchScheduler then
+        # coalesces their CNN work), instead of queueing in the dev
+        # server. Falls back to Flask's threaded dev server if waitress
+        # is not installed.
         logger.info(f"Starting Facial Authentication System API on port {port} in {env} mode")
-        app.run(host='0.0.0.0', port=port, debug=(env == 'development'))
+        if env != 'development':
+            try:
+                from waitress import serve
+                serve(app, host='0.0.0.0', port=port, threads=8)
+                return
+            except ImportError:
+                logger.warning("waitress not installed, using Flask's built-in server")
+        app.run(host='0.0.0.0', port=port, debug=(env == 'development'), threaded=True)
         
     except Exception as e:
         logger.error(f"Error starting application: {str(e)}")
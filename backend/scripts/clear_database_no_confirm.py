@@ -23,41 +23,40 @@ def clear_database():
             print(f"Database file not found at {db_path}")
             return False
         
-        # Connect to the database
+        # Connect to the database. This is a throwaway admin operation,
+        # so skip fsyncs entirely; WAL keeps concurrent readers working
         conn = sqlite3.connect(db_path)
+        conn.executescript("PRAGMA journal_mode=WAL; PRAGMA synchronous=OFF;")
         cursor = conn.cursor()
-        
+
         # Get table names to verify they exist
         cursor.execute("SELECT name FROM sqlite_master WHERE type='table';")
-        tables = cursor.fetchall()
-        table_names = [table[0] for table in tables]
-        
+        table_names = [table[0] for table in cursor.fetchall()]
+
         print(f"Found tables: {', '.join(table_names)}")
-        
-        # Clear the facial_data table first (due to foreign key constraints)
-        if 'facial_data' in table_names:
-            cursor.execute("DELETE FROM facial_data;")
-            print(f"Deleted records from facial_data table")
-        else:
-            print("facial_data table not found")
-        
-        # Clear the users table
-        if 'users' in table_names:
-            cursor.execute("DELETE FROM users;")
-            print(f"Deleted records from users table")
-        else:
-            print("users table not found")
-        
-        # Commit the changes
-        conn.commit()
-        
-        # Verify tables are empty
-        for table in ['users', 'facial_data']:
-            if table in table_names:
-                cursor.execute(f"SELECT COUNT(*) FROM {table};")
-                count = cursor.fetchone()[0]
-                print(f"Rows remaining in {table}: {count}")
-        
+
+        if 'facial_data' not in table_names or 'users' not in table_names:
+            print("users/facial_data tables not found")
+            conn.close()
+            return False
+
+        # Both deletes in one script under one transaction: SQLite
+        # preps and runs the statements back to back while holding the
+        # write lock once. facial_data goes first because of its
+        # foreign key on users.
+        conn.executescript(
+            "BEGIN; DELETE FROM facial_data; DELETE FROM users; COMMIT;"
+        )
+        print("Deleted records from facial_data and users tables")
+
+        # Verify both tables are empty with a single round trip
+        cursor.execute(
+            "SELECT (SELECT COUNT(*) FROM users), (SELECT COUNT(*) FROM facial_data);"
+        )
+        users_count, facial_count = cursor.fetchone()
+        print(f"Rows remaining in users: {users_count}")
+        print(f"Rows remaining in facial_data: {facial_count}")
+
         # Close the connection
         conn.close()
         return True
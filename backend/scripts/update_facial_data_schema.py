@@ -28,32 +28,40 @@ def update_db_schema():
         # Connect to the database
         with sqlite3.connect(db_path) as conn:
             cursor = conn.cursor()
-            
-            # Check if columns already exist
-            cursor.execute("PRAGMA table_info(facial_data)")
-            columns = [info[1] for info in cursor.fetchall()]
-            
-            # Add emotion_scores column if it doesn't exist
-            if 'emotion_scores' not in columns:
-                logger.info("Adding emotion_scores column to facial_data table")
-                cursor.execute("ALTER TABLE facial_data ADD COLUMN emotion_scores TEXT")
-            else:
-                logger.info("emotion_scores column already exists")
-                
-            # Add image_path column if it doesn't exist
-            if 'image_path' not in columns:
-                logger.info("Adding image_path column to facial_data table")
-                cursor.execute("ALTER TABLE facial_data ADD COLUMN image_path TEXT")
-            else:
-                logger.info("image_path column already exists")
-                
+
+            # Schema-version fast path: a single integer read instead of
+            # parsing the whole table_info result on every invocation
+            cursor.execute("PRAGMA user_version")
+            if cursor.fetchone()[0] >= 1:
+                logger.info("Schema already at version 1, nothing to do")
+                return True
+
+            # SQLite has no ADD COLUMN IF NOT EXISTS, so databases
+            # migrated before the version stamp raise OperationalError
+            # for columns that already exist — that's fine
+            for column, ddl in (
+                ('emotion_scores', "ALTER TABLE facial_data ADD COLUMN emotion_scores TEXT"),
+                ('image_path', "ALTER TABLE facial_data ADD COLUMN image_path TEXT"),
+            ):
+                try:
+                    cursor.execute(ddl)
+                    logger.info(f"Added {column} column to facial_data table")
+                except sqlite3.OperationalError:
+                    logger.info(f"{column} column already exists")
+
+            # Stamp the schema version so future runs exit on the fast path
+            cursor.execute("PRAGMA user_version = 1")
             conn.commit()
-            
-            # Verify the changes
-            cursor.execute("PRAGMA table_info(facial_data)")
-            updated_columns = [info[1] for info in cursor.fetchall()]
-            logger.info(f"Updated table columns: {updated_columns}")
-            
+
+            # Verify the changes: filter pragma_table_info in SQL so
+            # only the two relevant rows ever reach Python
+            cursor.execute(
+                "SELECT COUNT(*) FROM pragma_table_info('facial_data') "
+                "WHERE name IN ('emotion_scores', 'image_path')"
+            )
+            present = cursor.fetchone()[0]
+            logger.info(f"Verified {present}/2 new columns present in facial_data")
+
         logger.info("Database schema update completed successfully")
         return True
         